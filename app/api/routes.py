@@ -1,28 +1,74 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
 from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from ..models.exchange_rate import ExchangeRate
 from ..services.scraper import ExchangeRateScraper
+from ..services.cache import ResponseCache
+from config import Config
 import logging
+import orjson
+from bisect import bisect_left
 from concurrent.futures import ThreadPoolExecutor
 import concurrent.futures
 import os
+import atexit
+import threading
+import hashlib
 
 # Initialize Flask app and enable CORS
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=['ETag'])
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
 logger = logging.getLogger(__name__)
 
 # Database setup
 database_url = os.getenv('DATABASE_URL', 'sqlite:///exchange_rates.db')
-engine = create_engine(database_url)
+if database_url.startswith('sqlite'):
+    # SQLAlchemy's default SQLite pool already reuses file connections
+    engine = create_engine(database_url)
+else:
+    # Reuse the most recently returned connection so idle ones can expire
+    engine = create_engine(
+        database_url,
+        poolclass=QueuePool,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_use_lifo=True
+    )
 Session = sessionmaker(bind=engine)
 
+# Shared scraper so its HTTP session and fetch cache outlive a single sync;
+# built on first sync so importing the app (or forking preloaded workers)
+# never opens the database
+_scraper = None
+_scraper_lock = threading.Lock()
+
+# Cache for rate series served by /api/forex-data
+cache = ResponseCache(Config.REDIS_URL)
+
+# Shared pool for per-pair syncs; chunk fetches run on the scraper's own
+# pool so pair tasks never wait on work queued behind them
+_SYNC_POOL = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
+atexit.register(_SYNC_POOL.shutdown)
+
+# Supported periods and their lengths
+PERIOD_MAPPING = {
+    '1W': timedelta(weeks=1),
+    '1M': timedelta(days=30),
+    '3M': timedelta(days=90),
+    '6M': timedelta(days=180),
+    '1Y': timedelta(days=365)
+}
+
 def parse_period(period: str) -> timedelta:
     """
     Convert period string to timedelta object
@@ -36,21 +82,26 @@ def parse_period(period: str) -> timedelta:
     Raises:
         ValueError: If period format is invalid
     """
-    period_mapping = {
-        '1W': timedelta(weeks=1),
-        '1M': timedelta(days=30),
-        '3M': timedelta(days=90),
-        '6M': timedelta(days=180),
-        '1Y': timedelta(days=365)
-    }
+    try:
+        return PERIOD_MAPPING[period.upper()]
+    except KeyError:
+        raise ValueError(
+            f"Invalid period: {period}. Supported periods are 1W, 1M, 3M, 6M, 1Y"
+        ) from None
+
+def json_response(payload, status: int = 200) -> Response:
+    """
+    Serialize payload with orjson into a JSON response
     
-    normalized_period = period.upper()
-    if normalized_period in period_mapping:
-        return period_mapping[normalized_period]
+    Args:
+        payload: JSON-serializable response body
+        status (int): HTTP status code
     
-    raise ValueError(
-        f"Invalid period: {period}. Supported periods are 1W, 1M, 3M, 6M, 1Y"
-    )
+    Returns:
+        Response: Flask response with an application/json body
+    """
+    return Response(orjson.dumps(payload), status=status,
+                    mimetype='application/json')
 
 @app.route('/api/forex-data', methods=['POST'])
 def get_forex_data():
@@ -66,51 +117,78 @@ def get_forex_data():
         
         logger.info(f"Request received - {from_currency} to {to_currency}, period: {period}")
         
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - parse_period(period)
-        
-        # Format currency pair for Yahoo Finance
-        currency_pair = f"{from_currency}{to_currency}=X"
+        # Validate period before touching the cache
+        period_delta = parse_period(period)
         
-        # Query database
-        with Session() as session:
-            data = session.query(ExchangeRate).filter(
-                ExchangeRate.currency_pair == currency_pair,
-                ExchangeRate.date >= start_date.strftime('%Y-%m-%d'),
-                ExchangeRate.date <= end_date.strftime('%Y-%m-%d')
-            ).order_by(ExchangeRate.date.asc()).all()
-            
-            if not data:
-                return jsonify({
-                    'success': False,
-                    'error': 'No data available for the specified period and currency pair'
-                }), 404
-            
-            # Process results
-            latest_rate = data[-1].close_rate
-            converted_amount = amount * latest_rate if amount else None
+        # Serve the rate series from cache when available
+        cache_key = f"{from_currency}:{to_currency}:{period.upper()}"
+        serialized = cache.get(cache_key)
+        if serialized is not None:
+            series = orjson.loads(serialized)
+        else:
+            # Calculate date range and Yahoo Finance currency pair
+            end_date = datetime.now(timezone.utc).date()
+            start_date = end_date - period_delta
+            currency_pair = f"{from_currency}{to_currency}=X"
             
-            forex_data = [
-                {'date': rate.date, 'rate': rate.close_rate} 
-                for rate in data
-            ]
-            
-            return jsonify({
+            # Query database
+            with Session() as session:
+                data = session.query(
+                    ExchangeRate.date, ExchangeRate.close_rate
+                ).filter(
+                    ExchangeRate.currency_pair == currency_pair,
+                    ExchangeRate.date.between(start_date, end_date)
+                ).order_by(ExchangeRate.date.asc()).all()
+                
+                if not data:
+                    return json_response({
+                        'success': False,
+                        'error': 'No data available for the specified period and currency pair'
+                    }, 404)
+                
+                # Process results
+                series = {
+                    'data': [
+                        {'date': date.isoformat(), 'rate': rate}
+                        for date, rate in data
+                    ],
+                    'current_rate': data[-1][1]
+                }
+            serialized = orjson.dumps(series).decode('utf-8')
+            cache.set(cache_key, serialized, Config.CACHE_TTL)
+        
+        latest_rate = series['current_rate']
+        converted_amount = amount * latest_rate if amount else None
+        
+        # Weak ETag over the request parameters and the full serialized
+        # series, so any changed rate invalidates a client's copy
+        etag = hashlib.sha1(
+            orjson.dumps([from_currency, to_currency, period, amount])
+            + serialized.encode('utf-8')
+        ).hexdigest()
+        # RFC 9110 reserves 304 for GET/HEAD (a POST would get 412), but
+        # this POST is a read-only query polled by clients, so it answers
+        # like a GET. Only an explicit tag matches; '*' never does.
+        if etag in request.if_none_match.as_set(include_weak=True):
+            response = Response(status=304)
+        else:
+            response = json_response({
                 'success': True,
                 'from': from_currency,
                 'to': to_currency,
                 'period': period,
-                'data': forex_data,
+                'data': series['data'],
                 'current_rate': latest_rate,
                 'converted_amount': converted_amount
             })
+        response.set_etag(etag, weak=True)
+        return response
             
     except ValueError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
+        return json_response({'success': False, 'error': str(e)}, 400)
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
-        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+        return json_response({'success': False, 'error': 'Internal server error'}, 500)
 
 @app.route('/api/sync-forex-data', methods=['GET'])
 def sync_forex_data():
@@ -126,30 +204,43 @@ def sync_forex_data():
         logger.info("Starting forex data sync")
         
         # Use thread pool for parallel processing
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            futures = [
-                executor.submit(process_single_pair, from_curr, to_curr)
-                for from_curr, to_curr in currency_pairs
-            ]
-            
-            # Collect results
-            results = {}
-            for future in concurrent.futures.as_completed(futures):
-                pair_results = future.result()
-                if pair_results:
-                    results.update(pair_results)
+        futures = [
+            _SYNC_POOL.submit(process_single_pair, from_curr, to_curr)
+            for from_curr, to_curr in currency_pairs
+        ]
+        
+        # Collect results
+        results = {}
+        for future in concurrent.futures.as_completed(futures):
+            pair_results = future.result()
+            if pair_results:
+                results.update(pair_results)
+        
+        # Freshly synced rates supersede anything cached
+        cache.clear()
         
         logger.info("Forex data sync completed")
-        return jsonify({
+        return json_response({
             'message': 'Sync completed',
             'results': results
-        }), 200
+        })
         
     except Exception as e:
         logger.error(f"Sync process failed: {str(e)}")
-        return jsonify({
+        return json_response({
             'error': f'Sync process failed: {str(e)}'
-        }), 500
+        }, 500)
+
+def get_scraper() -> ExchangeRateScraper:
+    """
+    Return the process-wide scraper, creating it on first use
+    """
+    global _scraper
+    if _scraper is None:
+        with _scraper_lock:
+            if _scraper is None:
+                _scraper = ExchangeRateScraper()
+    return _scraper
 
 def process_single_pair(from_currency: str, to_currency: str) -> dict:
     """
@@ -173,23 +264,13 @@ def process_single_pair(from_currency: str, to_currency: str) -> dict:
         
         logger.info(f"Syncing {currency_pair} for 1Y period")
         
-        # Fetch and parse data
-        scraper = ExchangeRateScraper()
-        html_content = scraper.get_exchange_data(
+        # Fetch, parse and save data chunk by chunk
+        exchange_rates = get_scraper().get_exchange_data(
             currency_pair, 
             str(int(start_date.timestamp())),
             str(int(end_date.timestamp()))
         )
         
-        if not html_content:
-            return {
-                currency_pair: {
-                    period: {'status': 'error', 'message': 'Failed to fetch data'}
-                    for period in periods
-                }
-            }
-        
-        exchange_rates = scraper.parse_exchange_data(html_content, currency_pair)
         if not exchange_rates:
             return {
                 currency_pair: {
@@ -198,19 +279,14 @@ def process_single_pair(from_currency: str, to_currency: str) -> dict:
                 }
             }
         
-        # Save data and calculate results for each period
-        scraper.save_to_database(exchange_rates)
+        # Calculate results for each period; rows arrive sorted by date
+        dates = [rate['date'] for rate in exchange_rates]
         for period in periods:
-            period_delta = parse_period(period)
-            period_start = end_date - period_delta
-            period_records = [
-                rate for rate in exchange_rates 
-                if datetime.strptime(rate['date'], '%Y-%m-%d') >= period_start
-            ]
+            period_start = (end_date - parse_period(period)).date()
             
             results[currency_pair][period] = {
                 'status': 'success',
-                'records': len(period_records)
+                'records': len(dates) - bisect_left(dates, period_start)
             }
         
         return results
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
 # Create Base for declarative models
@@ -12,7 +12,7 @@ class ExchangeRate(Base):
     Attributes:
         id (int): Primary key
         currency_pair (str): Currency pair identifier (e.g., 'GBPINR=X')
-        date (str): Date of the exchange rate
+        date (date): Date of the exchange rate
         open_rate (float): Opening rate for the day
         high_rate (float): Highest rate for the day
         low_rate (float): Lowest rate for the day
@@ -24,7 +24,7 @@ class ExchangeRate(Base):
     __tablename__ = 'exchange_rates'
     id = Column(Integer, primary_key=True, autoincrement=True)
     currency_pair = Column(String, nullable=False)
-    date = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
     open_rate = Column(Float)
     high_rate = Column(Float)
     low_rate = Column(Float)
@@ -32,9 +32,13 @@ class ExchangeRate(Base):
     adj_close = Column(Float)
     volume = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
-    # Add unique constraint for currency pair and date combination
+    # Add unique constraint for currency pair and date combination, plus an
+    # explicit index so every backend can serve pair/date range scans in order
+    # (close_rate is included so rate series reads are index-only)
     __table_args__ = (
         UniqueConstraint('currency_pair', 'date', name='unique_currency_date'),
+        Index('ix_exchange_rates_pair_date_close',
+              'currency_pair', 'date', 'close_rate'),
     )
     def __repr__(self):
         """String representation of the exchange rate record"""
@@ -0,0 +1,91 @@
+import threading
+import time
+import logging
+
+try:
+    import redis
+except ImportError:  # Redis is optional; fall back to an in-process cache
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    Small TTL cache for serialized API payloads
+
+    Uses Redis when a URL is configured and the client library is
+    installed, otherwise keeps entries in a process-local dictionary.
+    """
+
+    def __init__(self, redis_url: str = None, prefix: str = 'forex:'):
+        """
+        Initialize the cache backend
+
+        Args:
+            redis_url (str): Redis connection URL, or None for in-process
+            prefix (str): Namespace prepended to every key
+        """
+        self.prefix = prefix
+        self._redis = None
+        self._local = {}
+        self._lock = threading.Lock()
+
+        if redis_url and redis is not None:
+            self._redis = redis.Redis.from_url(redis_url)
+        elif redis_url:
+            logger.warning("REDIS_URL is set but redis is not installed; "
+                           "using in-process cache")
+
+    def get(self, key: str):
+        """
+        Return the cached string for key, or None on miss or expiry
+        """
+        key = self.prefix + key
+        if self._redis is not None:
+            try:
+                value = self._redis.get(key)
+                return value.decode('utf-8') if value is not None else None
+            except redis.RedisError as e:
+                logger.warning(f"Cache read failed: {str(e)}")
+                return None
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._local[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        """
+        Store value under key for ttl seconds
+        """
+        key = self.prefix + key
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, ttl, value)
+            except redis.RedisError as e:
+                logger.warning(f"Cache write failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        """
+        Drop every entry under this cache's prefix
+        """
+        if self._redis is not None:
+            try:
+                keys = list(self._redis.scan_iter(match=self.prefix + '*'))
+                if keys:
+                    self._redis.delete(*keys)
+            except redis.RedisError as e:
+                logger.warning(f"Cache clear failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._local.clear()
@@ -1,24 +1,64 @@
 import requests
-from fake_useragent import UserAgent
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import lxml.html
+import pandas as pd
 from datetime import datetime
 import time
+import threading
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.dialects.sqlite import insert
 import concurrent.futures
+import atexit
+from itertools import chain, islice
 from ..models.exchange_rate import ExchangeRate, Base
 from functools import lru_cache
+from operator import itemgetter
+from config import Config
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Shared pool for chunk fetches, reused across scrapers and syncs
+_HTTP_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=Config.MAX_WORKERS * 4
+)
+atexit.register(_HTTP_POOL.shutdown)
+
+# Shared user-agent generator, loaded on first use
+_user_agent = None
+_user_agent_lock = threading.Lock()
+
+# Chunk boundaries are aligned to whole UTC days so cache keys repeat
+DAY_SECONDS = 24 * 60 * 60
+
+# Rows per multi-row UPSERT; 500 rows * 9 bound parameters stays well
+# under SQLite's 32766-variable limit (SQLite >= 3.32)
+UPSERT_BATCH_SIZE = 500
+
+# Numeric price columns in Yahoo's history table, in display order
+PRICE_COLUMNS = (
+    'open_rate', 'high_rate', 'low_rate', 'close_rate', 'adj_close'
+)
+
+# Translation table removing thousands separators from numeric cells
+STRIP_COMMAS = str.maketrans('', '', ',')
+
+# Columns refreshed when a (currency_pair, date) row already exists
+UPSERT_UPDATE_COLUMNS = (*PRICE_COLUMNS, 'volume')
+
+def get_user_agent():
+    """
+    Return the process-wide UserAgent, importing and loading it on first use
+    """
+    global _user_agent
+    if _user_agent is None:
+        with _user_agent_lock:
+            if _user_agent is None:
+                from fake_useragent import UserAgent
+                _user_agent = UserAgent()
+    return _user_agent
+
 class ExchangeRateScraper:
     """
     Scraper for fetching and storing exchange rate data from Yahoo Finance
@@ -37,10 +77,36 @@ class ExchangeRateScraper:
             pool_size=1,                   # Single connection pool for SQLite
             max_overflow=0                 # No overflow connections
         )
+        event.listen(self.engine, 'connect', self._set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
+        
+        # Reuse keep-alive HTTP connections across retries and chunks
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=8))
+        
+        # Per-instance cache of closed (pre-today) chunks, keyed on
+        # (quote, from_date, to_date) only; older days age out via LRU
+        self._cached_fetch = lru_cache(maxsize=16)(self._fetch_data_with_retry)
+
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """
+        Tune each new SQLite connection for concurrent reads during syncs
+        
+        WAL lets API readers proceed while the scraper writes, and
+        synchronous=NORMAL only fsyncs at WAL checkpoints.
+        """
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")   # 256 MiB
+            cursor.execute("PRAGMA cache_size=-65536")     # 64 MiB
+        finally:
+            cursor.close()
 
-    def get_exchange_data(self, quote: str, from_date: str, to_date: str) -> str:
+    def get_exchange_data(self, quote: str, from_date: str, to_date: str) -> list:
         """
         Fetch exchange rate data with pagination for long periods
         
@@ -50,10 +116,12 @@ class ExchangeRateScraper:
             to_date: End timestamp
         
         Returns:
-            str: Combined HTML content from all chunks
+            list: Parsed exchange rate rows from all chunks, sorted by date
         """
-        from_date = int(from_date)
-        to_date = int(to_date)
+        # Widen the range to whole UTC days so repeated syncs on the same
+        # day produce identical chunk boundaries
+        from_date = int(from_date) // DAY_SECONDS * DAY_SECONDS
+        to_date = -(-int(to_date) // DAY_SECONDS) * DAY_SECONDS
         
         logger.info(
             f"Fetching data for {quote} from "
@@ -62,7 +130,7 @@ class ExchangeRateScraper:
         )
         
         # Split request into 3-month chunks
-        three_months = 90 * 24 * 60 * 60  # in seconds
+        three_months = 90 * DAY_SECONDS
         chunks = []
         current_from = from_date
         
@@ -72,56 +140,79 @@ class ExchangeRateScraper:
             current_from = current_to + 1
         
         logger.info(f"Split request into {len(chunks)} chunks")
+        if not chunks:
+            return None
         
-        # Fetch chunks in parallel
+        # A single chunk needs no thread pool
+        if len(chunks) == 1:
+            try:
+                data = self._fetch_and_save_chunk(quote, *chunks[0], 1, 1)
+            except Exception as exc:
+                logger.error(f"Chunk {chunks[0][0]} to {chunks[0][1]} failed: {exc}")
+                return None
+            return sorted(data, key=itemgetter('date')) if data else None
+        
+        # Fetch chunks in parallel on the shared pool
         all_data = []
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = {
-                executor.submit(
-                    self._fetch_and_save_chunk,
-                    quote,
-                    chunk_from,
-                    chunk_to,
-                    i+1,
-                    len(chunks)
-                ): (chunk_from, chunk_to)
-                for i, (chunk_from, chunk_to) in enumerate(chunks)
-            }
-            
-            for future in concurrent.futures.as_completed(futures):
-                chunk_from, chunk_to = futures[future]
-                try:
-                    data = future.result()
-                    if data:
-                        all_data.append(data)
-                except Exception as exc:
-                    logger.error(f"Chunk {chunk_from} to {chunk_to} failed: {exc}")
+        futures = {
+            _HTTP_POOL.submit(
+                self._fetch_and_save_chunk,
+                quote,
+                chunk_from,
+                chunk_to,
+                i+1,
+                len(chunks)
+            ): (chunk_from, chunk_to)
+            for i, (chunk_from, chunk_to) in enumerate(chunks)
+        }
         
-        return '\n'.join(all_data) if all_data else None
+        for future in concurrent.futures.as_completed(futures):
+            chunk_from, chunk_to = futures[future]
+            try:
+                data = future.result()
+                if data:
+                    all_data.append(data)
+            except Exception as exc:
+                logger.error(f"Chunk {chunk_from} to {chunk_to} failed: {exc}")
+        
+        # Merge chunks, dropping rows repeated at chunk boundaries
+        rows_by_date = {
+            row['date']: row for row in chain.from_iterable(all_data)
+        }
+        if not rows_by_date:
+            return None
+        return [rows_by_date[date] for date in sorted(rows_by_date)]
 
     def _fetch_and_save_chunk(self, quote: str, chunk_from: str, 
                              chunk_to: str, chunk_index: int, 
-                             total_chunks: int) -> str:
+                             total_chunks: int) -> list:
         """
-        Fetch and save a single chunk of exchange rate data
+        Fetch, parse and save a single chunk of exchange rate data
+        
+        Returns:
+            list: Parsed rows saved from this chunk, or None
         """
         logger.info(f"Fetching chunk {chunk_index}/{total_chunks}")
         chunk_data = self._fetch_chunk(quote, chunk_from, chunk_to)
+        if not chunk_data:
+            return None
         
-        if chunk_data:
-            parsed_data = self.parse_exchange_data(chunk_data, quote)
-            if parsed_data:
-                logger.info(f"Saving {len(parsed_data)} records from chunk {chunk_index}")
-                self.save_to_database(parsed_data)
+        parsed_data = self.parse_exchange_data(chunk_data, quote)
+        if parsed_data:
+            logger.info(f"Saving {len(parsed_data)} records from chunk {chunk_index}")
+            self.save_to_database(parsed_data)
                 
-        return chunk_data
+        return parsed_data
 
-    @lru_cache(maxsize=32)
     def _fetch_chunk(self, quote: str, from_date: str, to_date: str) -> str:
         """
-        Cached method to fetch a chunk of data
+        Fetch a chunk of data, reusing cached responses for past days
         """
         try:
+            # Chunks reaching into today can still change, so always refetch
+            start_of_today = int(time.time()) // DAY_SECONDS * DAY_SECONDS
+            if int(to_date) <= start_of_today:
+                return self._cached_fetch(quote, from_date, to_date)
             return self._fetch_data_with_retry(quote, from_date, to_date)
         except Exception as e:
             logger.error(f"Error fetching data: {str(e)}")
@@ -134,15 +225,16 @@ class ExchangeRateScraper:
         """
         for attempt in range(max_retries):
             try:
-                ua = UserAgent()
-                headers = {'User-Agent': ua.random}
+                headers = {'User-Agent': get_user_agent().random}
                 
                 url = (
                     f"https://finance.yahoo.com/quote/{quote}/history"
                     f"?period1={from_date}&period2={to_date}&interval=1d"
                 )
                 
-                response = requests.get(url, headers=headers)
+                response = self._http.get(
+                    url, headers=headers, timeout=Config.REQUEST_TIMEOUT
+                )
                 if response.status_code == 200:
                     return response.text
                     
@@ -154,7 +246,10 @@ class ExchangeRateScraper:
                 # Exponential backoff
                 time.sleep(2 ** attempt)
         
-        return None
+        # Raise rather than return None so failures are never cached
+        raise requests.HTTPError(
+            f"Failed to fetch {quote} after {max_retries} attempts"
+        )
 
     def parse_exchange_data(self, html_content: str, currency_pair: str) -> list:
         """
@@ -167,46 +262,60 @@ class ExchangeRateScraper:
             logger.error("Empty HTML content received")
             return None
             
-        soup = BeautifulSoup(html_content, 'html.parser')
-        rows = soup.find_all('tr', class_='yf-j5d1ld')
+        tree = lxml.html.fromstring(html_content)
+        rows = tree.xpath(
+            "//tr[contains(concat(' ', normalize-space(@class), ' '), ' yf-j5d1ld ')]"
+        )
         
         if not rows:
             logger.error("No exchange rate rows found in HTML content")
             return None
         
-        data = []
-        for row in rows:
-            cols = row.find_all('td')
-            if len(cols) >= 7:
-                try:
-                    date_str = cols[0].text.strip()
-                    if not date_str:
-                        continue
-                        
-                    date = datetime.strptime(date_str, '%b %d, %Y').strftime('%Y-%m-%d')
-                    
-                    # Validate data
-                    if any(col.text.strip() in ['-', '', 'null', 'None'] 
-                          for col in cols[1:6]):
-                        logger.warning(f"Invalid data for date: {date}")
-                        continue
-                        
-                    exchange_rate_data = {
-                        'currency_pair': currency_pair,
-                        'date': date,
-                        'open_rate': float(cols[1].text.replace(',', '')),
-                        'high_rate': float(cols[2].text.replace(',', '')),
-                        'low_rate': float(cols[3].text.replace(',', '')),
-                        'close_rate': float(cols[4].text.replace(',', '')),
-                        'adj_close': float(cols[5].text.replace(',', '')),
-                        'volume': int(cols[6].text.replace(',', '')) 
-                                 if cols[6].text.strip() != '-' else 0
-                    }
-                    data.append(exchange_rate_data)
-                    
-                except (ValueError, IndexError) as e:
-                    logger.warning(f"Error parsing row: {e}")
-                    continue
+        # Keep full price rows only; dividend/split rows span fewer cells
+        cells = [
+            [cell.text_content().strip() for cell in row.xpath('./td')][:7]
+            for row in rows
+        ]
+        df = pd.DataFrame(
+            [row for row in cells if len(row) == 7 and row[0]],
+            columns=['date', *PRICE_COLUMNS, 'volume']
+        )
+        if df.empty:
+            logger.error("No valid data rows were parsed")
+            return None
+        
+        # Convert whole columns at once; unparseable cells become NaN/NaT
+        dates = pd.to_datetime(df['date'], format='%b %d, %Y', errors='coerce')
+        prices = df[list(PRICE_COLUMNS)].apply(
+            lambda col: pd.to_numeric(
+                col.str.translate(STRIP_COMMAS), errors='coerce'
+            )
+        )
+        # Only a '-' volume means zero; any other unparseable or fractional
+        # volume invalidates the row, as int() did
+        volume = pd.to_numeric(
+            df['volume'].mask(df['volume'] == '-', '0').str.translate(STRIP_COMMAS),
+            errors='coerce'
+        )
+        
+        # Validate data
+        valid = (
+            dates.notna()
+            & prices.notna().all(axis=1)
+            & volume.notna()
+            & (volume == volume.round())
+        )
+        if not valid.all():
+            logger.warning(f"Skipped {int((~valid).sum())} invalid rows")
+        
+        parsed = prices[valid].assign(
+            currency_pair=currency_pair,
+            date=dates[valid].dt.date,
+            volume=volume[valid].astype('int64')
+        )
+        data = parsed[
+            ['currency_pair', 'date', *PRICE_COLUMNS, 'volume']
+        ].to_dict('records')
         
         if not data:
             logger.error("No valid data rows were parsed")
@@ -222,22 +331,26 @@ class ExchangeRateScraper:
         if not exchange_rates:
             return
         
-        session = self.Session()
         try:
-            for rate_data in exchange_rates:
-                stmt = insert(ExchangeRate).values(**rate_data)
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=['currency_pair', 'date'],
-                    set_=rate_data
-                )
-                session.execute(stmt)
-            session.commit()
+            # Core-level execution skips the ORM unit of work; the whole
+            # save is one transaction
+            with self.engine.begin() as connection:
+                rows = iter(exchange_rates)
+                while True:
+                    chunk = list(islice(rows, UPSERT_BATCH_SIZE))
+                    if not chunk:
+                        break
+                    stmt = insert(ExchangeRate).values(chunk)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=['currency_pair', 'date'],
+                        set_={
+                            column: stmt.excluded[column]
+                            for column in UPSERT_UPDATE_COLUMNS
+                        }
+                    )
+                    connection.execute(stmt)
             logger.info(f"Saved {len(exchange_rates)} records to database")
             
         except SQLAlchemyError as e:
             logger.error(f"Database error: {str(e)}")
-            session.rollback()
             raise
-            
-        finally:
-            session.close()
\ No newline at end of file
@@ -20,6 +20,12 @@ class Config:
         'DATABASE_URL',
         'sqlite:///exchange_rates.db'
     )
+    DB_POOL_SIZE = 10        # Persistent connections per worker
+    DB_MAX_OVERFLOW = 20     # Extra connections allowed under load
+    
+    # Cache Configuration
+    REDIS_URL = os.getenv('REDIS_URL')  # In-process cache when unset
+    CACHE_TTL = 300          # Forex data cache lifetime in seconds
     
     # API Configuration
     SUPPORTED_CURRENCIES = [